@@ -15,6 +15,22 @@ from cryptography.hazmat.primitives.ciphers import (Cipher, CipherContext, algor
                                                     modes)
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
+# -- compression --
+
+# zstd splits multi-threaded compression into jobs of at least this size, anything
+# smaller only pays for spinning up the worker threads
+ZSTD_MT_MIN_SIZE: typing.Final[int] = 1048576  # 1 MiB
+
+
+def zstd_compress(data: bytes, zstd_comp_lvl: int) -> bytes:
+    """zstd compress data, only using multiple threads for large enough data"""
+    return zstd.compress(
+        data,
+        zstd_comp_lvl,
+        zstd.ZSTD_threads_count() if len(data) >= ZSTD_MT_MIN_SIZE else 1,
+    )
+
+
 # -- hashing --
 
 HASHES: typing.Final[typing.Tuple[hashes.HashAlgorithm, ...]] = (
@@ -51,7 +67,7 @@ def hash_algo(hash_id: int, data: bytes) -> bytes:
 
 def hash_walgo(
     hash_id: int,
-    data: bytes,
+    data: typing.Union[bytes, memoryview],
     key: bytes,
     salt: bytes,
     kdf_iters: int,
@@ -82,7 +98,7 @@ def hash_walgo(
 
 def hash_walgo_compare(
     hash_id: int,
-    data: bytes,
+    data: typing.Union[bytes, memoryview],
     key: bytes,
     salt: bytes,
     kdf_iters: int,
@@ -209,6 +225,34 @@ def derive_secure_key(
     )
 
 
+class SecureSession:
+    """secure encryption w an alrd derived `derive_secure_key` key,
+    keeps the initialized cipher around so it can b reused across calls"""
+
+    def __init__(self, key: bytes, hash_salt_len: int, sec_crypto_passes: int) -> None:
+        self.fernet: Fernet = Fernet(key)
+        self.hash_salt_len: int = hash_salt_len
+        self.sec_crypto_passes: int = sec_crypto_passes
+
+    def encrypt(self, data: bytes, zstd_comp_lvl: int) -> bytes:
+        """securely encrypt data"""
+
+        for _ in range(self.sec_crypto_passes):
+            data = self.fernet.encrypt(data + RAND.randbytes(self.hash_salt_len))
+
+        return base64.b85encode(zstd_compress(data, zstd_comp_lvl))
+
+    def decrypt(self, data: bytes) -> bytes:
+        """securely decrypt data"""
+
+        data = zstd.decompress(base64.b85decode(data))
+
+        for _ in range(self.sec_crypto_passes):
+            data = self.fernet.decrypt(data)[: -self.hash_salt_len]
+
+        return data
+
+
 def encrypt_secure(
     data: bytes,
     password: bytes,
@@ -218,21 +262,21 @@ def encrypt_secure(
     sec_crypto_passes: int,
     kdf_iters: int,
     zstd_comp_lvl: int,
+    *,
+    key: typing.Optional[bytes] = None,
 ) -> bytes:
-    """securely encrypt data"""
-
-    for _ in range(sec_crypto_passes):
-        data = Fernet(
-            derive_secure_key(
-                password=password,
-                salt=salt,
-                hash_id=hash_id,
-                kdf_iters=kdf_iters,
-            )
-        ).encrypt(data + RAND.randbytes(hash_salt_len))
-
-    return base64.b85encode(
-        zstd.compress(data, zstd_comp_lvl, zstd.ZSTD_threads_count())
+    """securely encrypt data, optionally w a pre-derived `derive_secure_key` key"""
+
+    if key is None:
+        key = derive_secure_key(
+            password=password,
+            salt=salt,
+            hash_id=hash_id,
+            kdf_iters=kdf_iters,
+        )
+
+    return SecureSession(key, hash_salt_len, sec_crypto_passes).encrypt(
+        data, zstd_comp_lvl
     )
 
 
@@ -244,22 +288,20 @@ def decrypt_secure(
     hash_salt_len: int,
     sec_crypto_passes: int,
     kdf_iters: int,
+    *,
+    key: typing.Optional[bytes] = None,
 ) -> bytes:
-    """securely decrypt data"""
+    """securely decrypt data, optionally w a pre-derived `derive_secure_key` key"""
 
-    data = zstd.decompress(base64.b85decode(data))
-
-    for _ in range(sec_crypto_passes):
-        data = Fernet(
-            derive_secure_key(
-                password=password,
-                salt=salt,
-                hash_id=hash_id,
-                kdf_iters=kdf_iters,
-            )
-        ).decrypt(data)[:-hash_salt_len]
+    if key is None:
+        key = derive_secure_key(
+            password=password,
+            salt=salt,
+            hash_id=hash_id,
+            kdf_iters=kdf_iters,
+        )
 
-    return data
+    return SecureSession(key, hash_salt_len, sec_crypto_passes).decrypt(data)
 
 
 # -- rc4 encryption --
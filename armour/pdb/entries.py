@@ -2,25 +2,94 @@
 # -*- coding: utf-8 -*-
 """entries"""
 
+import itertools
 import multiprocessing as mp
 from abc import ABC, abstractmethod
 from contextlib import closing
-from io import BytesIO
-from typing import Any, Dict, List, Optional, Tuple, Type
+from functools import partial
+from typing import (IO, Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple,
+                    Type)
 
 from .. import crypt
 from . import exc, header, s
 
 
-def ___reval___(e: "PdbEntry") -> "PdbEntry":
-    """revalidate entry ( do not use this, this is used in `gather` )"""
-    return e.revalidate().validate_struct()
+def ___hash_ok___(
+    hash_args: Tuple[int, bytes, bytes, int, int],
+    entry: bytes,
+    ehash: bytes,
+) -> bool:
+    """check an entry hash ( do not use this, this is used in `_revalidate` )"""
+
+    hash_id, password, salt, kdf_passes, hash_salt_len = hash_args
+
+    return crypt.hash_walgo_compare(
+        hash_id,
+        entry,
+        password,
+        salt,
+        kdf_passes,
+        hash_salt_len,
+        ehash,
+    )
+
+
+_entry_ids: Iterator[int] = itertools.count()
+
+
+def _parse_fields(
+    mv: memoryview,
+    off: int = 0,
+) -> Tuple[List[Tuple[bytes, bytes]], int]:
+    """parse `(ident, value)` fields of an entry starting at `off` up to and
+    including its NULL byte, returns the fields and the offset after the NULL byte"""
+
+    fields: List[Tuple[bytes, bytes]] = []
+    unpack_L_from = s.unpack_L_from
+    LL: int = s.LL
+    BL: int = s.BL
+
+    while (ident := bytes(mv[off : off + BL])) != b"\0":
+        off += BL
+        (size,) = unpack_L_from(mv, off)
+        off += LL
+        fields.append((ident, bytes(mv[off : off + size])))
+        off += size
+
+    return fields, off + BL
+
+
+def _parse_entries(
+    entries: bytes,
+    ds: int,
+) -> List[Tuple[bytes, List[Tuple[bytes, bytes]]]]:
+    """parse all `(hash, fields)` entries, `ds` being the secure digest size"""
+
+    mv: memoryview = memoryview(entries)
+    end: int = len(mv)
+    off: int = 0
+    parsed: List[Tuple[bytes, List[Tuple[bytes, bytes]]]] = []
+
+    while off < end:
+        h: bytes = bytes(mv[off : off + ds])
+        fields, off = _parse_fields(mv, off + ds)
+        parsed.append((h, fields))
+
+    return parsed
 
 
 class PdbEntry(ABC):
     """entry abstract base class"""
 
-    entry_id: int = 0
+    __slots__: Tuple[str, ...] = (
+        "entry_id",
+        "head",
+        "fields",
+        "_ehash",
+        "_entry_cache",
+        "_full_cache",
+        "_dirty",
+    )
 
     def __init__(
         self,
@@ -28,13 +97,16 @@ class PdbEntry(ABC):
         ehash: bytes = b"",
         fields: Optional[Dict[bytes, bytes]] = None,
     ) -> None:
-        self.entry_id: int = PdbEntry.entry_id
-        PdbEntry.entry_id += 1
+        self.entry_id: int = next(_entry_ids)
 
         self.head: header.PdbHeader = head
-        self.ehash: bytes = ehash
         self.fields: Dict[bytes, bytes] = {}
 
+        self._ehash: bytes = ehash
+        self._entry_cache: Optional[bytes] = None
+        self._full_cache: Optional[bytes] = None
+        self._dirty: bool = True
+
         if fields is not None:
             for field, value in fields.items():
                 self[field] = value
@@ -45,24 +117,57 @@ class PdbEntry(ABC):
 
         :rtype: Self"""
 
-        b: BytesIO = BytesIO(entry)
-
-        while (ident := b.read(s.BL)) != b"\0":
-            self[ident] = b.read(s.sunpack(s.L, b))
+        for ident, value in _parse_fields(memoryview(entry))[0]:
+            self[ident] = value
 
         return self
 
+    @property
+    def ehash(self) -> bytes:
+        """get entry hash"""
+        return self._ehash
+
+    @ehash.setter
+    def ehash(self, value: bytes) -> None:
+        """set entry hash"""
+        self._ehash = value
+        self._full_cache = None
+
     @property
     def entry(self) -> bytes:
-        """return the non-full entry as bytes"""
-        return b"".join(
-            field + s.pack(s.L, len(data)) + data for field, data in self.fields.items()
-        )
+        """return the non-full entry as bytes ( cached until a field changes )"""
+
+        if self._dirty or self._entry_cache is None:
+            buf: bytearray = bytearray()
+            pack_L = s.pack_L
+
+            for field, data in self.fields.items():
+                buf += field
+                buf += pack_L(len(data))
+                buf += data
+
+            self._entry_cache = bytes(buf)
+            self._full_cache = None
+            self._dirty = False
+
+        return self._entry_cache
 
     @property
     def full_entry(self) -> bytes:
         """return the full entry ( hash + entry + NULL ) as bytes"""
-        return self.ehash + self.entry + b"\0"
+
+        entry: bytes = self.entry
+
+        if self._full_cache is None:
+            self._full_cache = self.ehash + entry + b"\0"
+
+        return self._full_cache
+
+    def write_into(self, buf: bytearray) -> None:
+        """append the full entry ( hash + entry + NULL ) to `buf`"""
+        buf += self.ehash
+        buf += self.entry
+        buf += b"\0"
 
     def rehash(self) -> Any:
         """rehash the entry
@@ -114,6 +219,8 @@ class PdbEntry(ABC):
             raise exc.InvalidIdentifier(ident, self.entry_id)
 
         self.fields[ident] = value
+        self._dirty = True
+
         return self
 
     def get_field_raw(self, ident: bytes) -> bytes:
@@ -164,6 +271,8 @@ class PdbEntry(ABC):
 class PdbRawEntry(PdbEntry):
     """pdb entries raw entry"""
 
+    __slots__: Tuple[str, ...] = ()
+
     def set_field(self, ident: bytes, value: bytes) -> "PdbRawEntry":
         """set field ident to value
 
@@ -189,40 +298,95 @@ class PdbRawEntry(PdbEntry):
 class PdbPwdEntry(PdbEntry):
     """pdb entries password entry"""
 
+    __slots__: Tuple[str, ...] = "_plain_cache", "_pending"
+
     all_fields: Tuple[bytes, ...] = b"n", b"u", b"p", b"r"
     encrypted_fields: Tuple[bytes, ...] = b"u", b"p"
 
+    _all_fields_set: FrozenSet[bytes] = frozenset(all_fields)
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        """rebuild the required field set from the subclass `all_fields`"""
+        super().__init_subclass__(**kwargs)
+        cls._all_fields_set = frozenset(cls.all_fields)
+
+    def __init__(
+        self,
+        head: header.PdbHeader,
+        ehash: bytes = b"",
+        fields: Optional[Dict[bytes, bytes]] = None,
+    ) -> None:
+        # known plaintext of encrypted fields, `_pending` ones r waiting to b encrypted
+        self._plain_cache: Dict[bytes, bytes] = {}
+        self._pending: Dict[bytes, None] = {}
+
+        super().__init__(head, ehash, fields)
+
     def _get_crypt(self, ident: bytes) -> bytes:
-        """get an encrypted value"""
-        return crypt.decrypt_secure(
-            self.get_field_raw(ident),
-            self.head.password,
-            self.head.salt,
-            self.head.hash_id,
-            self.head.hash_salt_len,
-            self.head.sec_crypto_passes,
-            self.head.kdf_passes,
-        )
+        """get an encrypted value ( decrypted once and cached until it changes )"""
+
+        if ident in self._plain_cache:
+            return self._plain_cache[ident]
+
+        value: bytes = self.head.crypt_session().decrypt(self.get_field_raw(ident))
+
+        self._plain_cache[ident] = value
+        return value
 
     def _set_crypt(self, ident: bytes, value: bytes) -> None:
-        """set an encrypted value"""
+        """set an encrypted value ( encrypted once the raw entry is needed )"""
 
         if ident == b"\0" or len(ident) != 1:
             raise exc.InvalidIdentifier(ident, self.entry_id)
 
-        self.set_field_raw(
-            ident,
-            crypt.encrypt_secure(
-                value,
-                self.head.password,
-                self.head.salt,
-                self.head.hash_id,
-                self.head.hash_salt_len,
-                self.head.sec_crypto_passes,
-                self.head.kdf_passes,
-                self.head.zstd_comp_lvl,
-            ),
-        )
+        # keep the field in its place so the entry layout follows the set order
+        self.fields.setdefault(ident, b"")
+
+        self._plain_cache[ident] = value
+        self._pending[ident] = None
+        self._dirty = True
+
+    def _flush_crypt(self) -> None:
+        """encrypt all pending encrypted fields in one go"""
+
+        if not self._pending:
+            return
+
+        session: crypt.SecureSession = self.head.crypt_session()
+
+        for ident in self._pending:
+            super().set_field_raw(
+                ident,
+                session.encrypt(self._plain_cache[ident], self.head.zstd_comp_lvl),
+            )
+
+        self._pending.clear()
+
+    @property
+    def entry(self) -> bytes:
+        """return the non-full entry as bytes ( cached until a field changes )"""
+        self._flush_crypt()
+        return super().entry
+
+    def set_field_raw(self, ident: bytes, value: bytes) -> "PdbPwdEntry":
+        """set field ident to value
+
+        :rtype: Self"""
+
+        super().set_field_raw(ident, value)
+
+        self._pending.pop(ident, None)
+        self._plain_cache.pop(ident, None)
+
+        return self
+
+    def get_field_raw(self, ident: bytes) -> bytes:
+        """set field ident to value"""
+
+        if ident in self._pending:
+            self._flush_crypt()
+
+        return super().get_field_raw(ident)
 
     # name
 
@@ -297,10 +461,12 @@ class PdbPwdEntry(PdbEntry):
     @property
     def struct_valid(self) -> bool:
         """check if the structure of the entry is valid"""
-        return all(field in self.fields for field in PdbPwdEntry.all_fields)
+        return self.fields.keys() >= type(self)._all_fields_set
 
     def __str__(self) -> str:
-        """shows all fields in the entry"""
+        """shows all fields in the entry, encrypted ones r masked
+        ( and so r never encrypted just to b shown )"""
+
         return "\n".join(
             f"field {field!r:10s} -- \
 {'***' if field in self.encrypted_fields else repr(data)}"
@@ -311,6 +477,8 @@ class PdbPwdEntry(PdbEntry):
 class PdbEntries:
     """stores all entries in a database"""
 
+    __slots__: Tuple[str, ...] = "ents", "head"
+
     def __init__(
         self,
         head: header.PdbHeader,
@@ -330,22 +498,51 @@ class PdbEntries:
         if not self.head.entries:
             return self
 
-        b: BytesIO = BytesIO(self.head.entries)
         ents: List[PdbEntry] = []
 
-        while (h := b.read(self.head.ds())) != b"":
+        for h, fields in _parse_entries(self.head.entries, self.head.ds()):
             e: PdbEntry = entry_t(self.head, h)
 
-            while (ident := b.read(s.BL)) != b"\0":
-                e.set_field_raw(ident, b.read(s.sunpack(s.L, b)))
+            for ident, value in fields:
+                e.set_field_raw(ident, value)
 
             ents.append(e)
 
-        with closing(mp.Pool(processes=jobs)) as p:
-            self.ents.extend(p.map(___reval___, ents))
+        self._revalidate(ents, jobs)
+
+        # validate everything first, so a bad entry doesnt leave `ents` half-filled
+        valid: List[PdbEntry] = [e.validate_struct() for e in ents]
+        self.ents.extend(valid)
 
         return self
 
+    def _revalidate(self, ents: List[PdbEntry], jobs: Optional[int] = None) -> None:
+        """revalidate hashes of `ents` in parallel, uses multiprocessing"""
+
+        # only ship the entry bytes and hash params to the workers, not the whole
+        # entry w its header ( and so all of the database entries )
+        with closing(mp.Pool(processes=jobs)) as p:
+            oks: List[bool] = p.starmap(
+                partial(
+                    ___hash_ok___,
+                    (
+                        self.head.hash_id,
+                        self.head.password,
+                        self.head.salt,
+                        self.head.kdf_passes,
+                        self.head.hash_salt_len,
+                    ),
+                ),
+                ((e.entry, e.ehash) for e in ents),
+            )
+
+        if bad := [e for e, ok in zip(ents, oks) if not ok]:
+            raise exc.DataIntegrityError(
+                f"bad hash / signature in entries \
+{', '.join(f'#{e.entry_id}' for e in bad)}",
+                bad[0].ehash,
+            )
+
     def clear(self) -> "PdbEntries":
         """clears all entries"""
         self.ents.clear()
@@ -357,16 +554,51 @@ class PdbEntries:
         self.ents.append(entry.revalidate().validate_struct())
         return self
 
+    def add_entries(
+        self,
+        entries: Iterable[PdbEntry],
+        jobs: Optional[int] = None,
+    ) -> "PdbEntries":
+        """add entries in bulk, in order, uses multiprocessing"""
+
+        ents: List[PdbEntry] = list(entries)
+
+        if ents:
+            self._revalidate(ents, jobs)
+
+            valid: List[PdbEntry] = [e.validate_struct() for e in ents]
+            self.ents.extend(valid)
+
+        return self
+
     @property
     def db_entries(self) -> bytes:
         """get all entries as bytes"""
-        return b"".join(e.full_entry for e in self.ents)
+
+        buf: bytearray = bytearray()
+
+        for e in self.ents:
+            e.write_into(buf)
+
+        return bytes(buf)
+
+    def write_to(self, fh: IO[bytes]) -> "PdbEntries":
+        """write all entries to a binary file handle wout joining them first"""
+
+        for e in self.ents:
+            fh.write(e.ehash)
+            fh.write(e.entry)
+            fh.write(b"\0")
+
+        return self
 
     def commit(self) -> "PdbEntries":
         """push all entries to the database"""
 
-        self.head.decrypt()
+        # the old entries get overwritten anyway, so theres no need to decrypt them
         self.head.entries = self.db_entries
+        self.head.encrypted = False
+
         return self
 
     def __str__(self) -> str:
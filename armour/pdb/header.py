@@ -3,7 +3,7 @@
 """pdb header"""
 
 import typing
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from io import BytesIO
 
 import zstd
@@ -40,6 +40,14 @@ class PdbHeader:
 
     encrypted: bool = True
 
+    _derived_key: typing.Optional[
+        typing.Tuple[typing.Tuple[typing.Any, ...], bytes]
+    ] = field(default=None, init=False, repr=False, compare=False)
+
+    _crypt_session: typing.Optional[
+        typing.Tuple[typing.Tuple[typing.Any, ...], crypt.SecureSession]
+    ] = field(default=None, init=False, repr=False, compare=False)
+
     @staticmethod
     def dds(hash_id: int) -> int:
         """return hash digest size"""
@@ -53,6 +61,37 @@ class PdbHeader:
 
         return self.hash_salt_len + self.dds(hash_id)
 
+    def derived_key(self) -> bytes:
+        """derive the secure encryption key once and reuse it
+        until `password`, `salt`, `hash_id` or `kdf_passes` change"""
+
+        params: typing.Tuple[typing.Any, ...] = (
+            self.password,
+            self.salt,
+            self.hash_id,
+            self.kdf_passes,
+        )
+
+        if self._derived_key is None or self._derived_key[0] != params:
+            self._derived_key = params, crypt.derive_secure_key(*params)
+
+        return self._derived_key[1]
+
+    def crypt_session(self) -> crypt.SecureSession:
+        """return the secure encryption session, reused until
+        its key, `hash_salt_len` or `sec_crypto_passes` change"""
+
+        params: typing.Tuple[typing.Any, ...] = (
+            self.derived_key(),
+            self.hash_salt_len,
+            self.sec_crypto_passes,
+        )
+
+        if self._crypt_session is None or self._crypt_session[0] != params:
+            self._crypt_session = params, crypt.SecureSession(*params)
+
+        return self._crypt_session[1]
+
     @classmethod
     def empty(cls, password: bytes = b"", salt: bytes = b"") -> "PdbHeader":
         """return an empty PdbHeader w default preset values"""
@@ -84,12 +123,14 @@ class PdbHeader:
         """parse header from db"""
 
         sds: int = cls.dds(0) + HASH_SALT_LEN
+        db_end: int = len(db) - sds
 
-        db_hash: bytes = db[-sds:]
+        db_hash: bytes = db[db_end:]
 
+        # hash a view of the db and let `BytesIO` share `db` to not copy the whole db
         if not crypt.hash_walgo_compare(
             0,
-            (db := db[:-sds]),
+            memoryview(db)[:db_end],
             password,
             salt,
             KDF_PASSES,
@@ -140,7 +181,7 @@ class PdbHeader:
 
         if not crypt.hash_walgo_compare(
             hash_id,
-            (entries := b.read()),
+            (entries := b.read(db_end - b.tell())),
             password,
             salt,
             kdf_passes,
@@ -229,16 +270,7 @@ class PdbHeader:
         if self.encrypted:
             return self
 
-        entries: bytes = crypt.encrypt_secure(
-            self.entries,
-            self.password,
-            self.salt,
-            self.hash_id,
-            self.hash_salt_len,
-            self.sec_crypto_passes,
-            self.kdf_passes,
-            self.zstd_comp_lvl,
-        )
+        entries: bytes = self.crypt_session().encrypt(self.entries, self.zstd_comp_lvl)
 
         entries = crypt.encrypt_aes(
             entries,
@@ -249,11 +281,7 @@ class PdbHeader:
             self.aes_crypto_passes,
         )
 
-        entries = zstd.compress(
-            entries,
-            self.zstd_comp_lvl,
-            zstd.ZSTD_threads_count(),
-        )
+        entries = crypt.zstd_compress(entries, self.zstd_comp_lvl)
 
         entries = crypt.encrypt_rc4(
             entries,
@@ -293,15 +321,7 @@ class PdbHeader:
             self.aes_crypto_passes,
         )
 
-        entries = crypt.decrypt_secure(
-            entries,
-            self.password,
-            self.salt,
-            self.hash_id,
-            self.hash_salt_len,
-            self.sec_crypto_passes,
-            self.kdf_passes,
-        )
+        entries = self.crypt_session().decrypt(entries)
 
         self.entries = entries
         self.encrypted = False
@@ -4,7 +4,7 @@
 
 import struct
 from io import BytesIO
-from typing import Any, Final
+from typing import Any, Callable, Final, Tuple
 
 S: Final[str] = "H"
 SL: Final[int] = 2
@@ -17,6 +17,11 @@ MAGIC: Final[int] = BL * 4
 L: Final[str] = "L"
 LL: Final[int] = 4
 
+_L_STRUCT: Final[struct.Struct] = struct.Struct(f"<{L}")
+
+pack_L: Final[Callable[..., bytes]] = _L_STRUCT.pack
+unpack_L_from: Final[Callable[..., Tuple[Any, ...]]] = _L_STRUCT.unpack_from
+
 
 def unpack(fmt: str, data: bytes) -> Any:
     """unpack bytes to primative types"""
@@ -3,6 +3,8 @@
 """pdb"""
 
 import os
+from io import BytesIO
+from typing import Any, List
 from warnings import filterwarnings as filter_warnings
 
 import armour
@@ -14,9 +16,294 @@ HASH_ID: int = 2
 ISEC_PASSES: int = 2
 
 
+def empty_head() -> armour.pdb.header.PdbHeader:
+    """fast in-memory header for checks"""
+
+    h: armour.pdb.header.PdbHeader = armour.pdb.header.PdbHeader.empty(PASSWORD, SALT)
+    h.kdf_passes = 1
+    h.hash_id = HASH_ID
+    h.isec_crypto_passes = ISEC_PASSES
+
+    return h
+
+
+def check_field_order() -> None:
+    """lazily encrypted fields keep their place in the entry"""
+
+    h: armour.pdb.header.PdbHeader = empty_head()
+    pwe: armour.pdb.entries.PdbPwdEntry = armour.pdb.entries.PdbPwdEntry(
+        h,
+        fields={b"n": b"name", b"u": b"user", b"p": b"pass", b"r": b"remark"},
+    )
+
+    assert pwe.struct_valid and b"u" in pwe
+    assert list(pwe.fields) == [b"n", b"u", b"p", b"r"]
+    assert str(pwe).count("***") == 2 and pwe.username not in str(pwe).encode()
+
+    # reading plain fields doesnt encrypt the pending ones
+    assert pwe.name == b"name" and pwe.fields[b"u"] == b""
+
+    pwe.rehash()
+
+    assert list(pwe.fields) == [b"n", b"u", b"p", b"r"]
+    assert pwe.get_field_raw(b"u") != b"user"
+    assert pwe.username == b"user" and pwe.password == b"pass"
+
+    print("field order ok")
+
+
+class PdbSecretEntry(armour.pdb.entries.PdbPwdEntry):
+    """password entry w an extra encrypted field"""
+
+    __slots__ = ("crypt_gets",)
+
+    all_fields = b"n", b"u", b"p", b"r", b"e"
+    encrypted_fields = b"u", b"p", b"e"
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.crypt_gets: int = 0
+        super().__init__(*args, **kwargs)
+
+    def _get_crypt(self, ident: bytes) -> bytes:
+        """count encrypted reads"""
+        self.crypt_gets += 1
+        return super()._get_crypt(ident)
+
+
+def check_subclass() -> None:
+    """subclasses keep their own encrypted fields and accessor overrides"""
+
+    se: PdbSecretEntry = PdbSecretEntry(
+        empty_head(),
+        fields={b"n": b"n", b"u": b"u", b"p": b"p", b"r": b"r", b"e": b"SECRET"},
+    ).rehash()
+
+    assert b"SECRET" not in se.get_field_raw(b"e")
+    assert b"SECRET" not in se.entry
+    assert se[b"e"] == b"SECRET" and se.crypt_gets == 1
+    assert "SECRET" not in str(se)
+    assert se.struct_valid
+
+    del se.fields[b"e"]
+    assert not se.struct_valid
+
+
+    pwe: armour.pdb.entries.PdbPwdEntry = armour.pdb.entries.PdbPwdEntry(
+        empty_head(), fields={b"e": b"plain"}
+    )
+    assert pwe.get_field_raw(b"e") == b"plain"
+    assert not pwe.struct_valid
+
+    pwe.fields.update(dict.fromkeys(pwe.all_fields, b""))
+    assert pwe.struct_valid
+
+    print("subclass ok")
+
+
+def check_entry_cache() -> None:
+    """cached entry bytes follow field and hash changes"""
+
+    e: armour.pdb.entries.PdbRawEntry = armour.pdb.entries.PdbRawEntry(
+        empty_head(), fields={b"x": b"x"}
+    ).rehash()
+
+    old_entry: bytes = e.entry
+    old_full: bytes = e.full_entry
+
+    e[b"r"] = b"new remark"
+    assert e.entry != old_entry and b"new remark" in e.entry
+    assert e.full_entry != old_full and e.full_entry.endswith(e.entry + b"\0")
+    assert not e.hash_ok()
+    assert e.rehash().hash_ok()
+
+    e.ehash = b"h"
+    assert e.full_entry == b"h" + e.entry + b"\0"
+
+    print("entry cache ok")
+
+
+def check_write_to() -> None:
+    """streamed entries match `db_entries`"""
+
+    h: armour.pdb.header.PdbHeader = empty_head()
+    ex: armour.pdb.entries.PdbEntries = armour.pdb.entries.PdbEntries(h)
+
+    for idx in range(3):
+        ex.add_entry(
+            armour.pdb.entries.PdbRawEntry(h, fields={b"x": bytes([idx + 1])}).rehash()
+        )
+
+    fh: BytesIO = BytesIO()
+    ex.write_to(fh)
+    assert fh.getvalue() == ex.db_entries
+
+    print("write_to ok")
+
+
+def check_derived_key() -> None:
+    """the derived key is reused until the password or salt change"""
+
+    h: armour.pdb.header.PdbHeader = empty_head()
+    key: bytes = h.derived_key()
+    assert h.derived_key() is key
+
+    h.password += b"!"
+    assert h.derived_key() != key
+
+    key = h.derived_key()
+    h.salt += b"!"
+    assert h.derived_key() != key
+
+    print("derived key ok")
+
+
+def check_plain_cache() -> None:
+    """decrypted fields r cached until the field changes"""
+
+    h: armour.pdb.header.PdbHeader = empty_head()
+    a: armour.pdb.entries.PdbPwdEntry = armour.pdb.entries.PdbPwdEntry(
+        h, fields={b"u": b"user a"}
+    ).rehash()
+    b: armour.pdb.entries.PdbPwdEntry = armour.pdb.entries.PdbPwdEntry(
+        h, fields={b"u": b"user b"}
+    ).rehash()
+
+    assert a.username == b"user a"
+
+    a.username = b"new user"
+    assert a.username == b"new user" and b"new user" not in a.entry
+
+    a.set_field_raw(b"u", b.get_field_raw(b"u"))
+    assert a.username == b"user b"
+
+    print("plain cache ok")
+
+
+def check_add_entries() -> None:
+    """bulk adding keeps order and reports every tampered entry"""
+
+    h: armour.pdb.header.PdbHeader = empty_head()
+
+    ents: List[armour.pdb.entries.PdbEntry] = [
+        armour.pdb.entries.PdbPwdEntry(
+            h,
+            fields={b"n": str(idx).encode(), b"u": b"u", b"p": b"p", b"r": b"r"},
+        ).rehash()
+        for idx in range(6)
+    ]
+
+    ex: armour.pdb.entries.PdbEntries = armour.pdb.entries.PdbEntries(h)
+    ex.add_entries(ents, jobs=2)
+    assert [e[b"n"] for e in ex.ents] == [str(idx).encode() for idx in range(6)]
+
+    bad: List[armour.pdb.entries.PdbEntry] = [
+        armour.pdb.entries.PdbRawEntry(h, fields={b"x": b"x"}).rehash()
+        for _ in range(3)
+    ]
+    bad[0][b"x"] = b"y"
+    bad[2][b"x"] = b"z"
+
+    ex = armour.pdb.entries.PdbEntries(h)
+
+    try:
+        ex.add_entries(bad, jobs=2)
+        raise AssertionError("tampered entries were accepted")
+    except armour.pdb.exc.DataIntegrityError as err:
+        assert f"#{bad[0].entry_id}" in str(err)
+        assert f"#{bad[1].entry_id}" not in str(err)
+        assert f"#{bad[2].entry_id}" in str(err)
+
+    assert not ex.ents
+
+    try:
+        ex.add_entries(
+            [
+                ents[0],
+                armour.pdb.entries.PdbPwdEntry(h, fields={b"n": b"n"}).rehash(),
+            ]
+        )
+        raise AssertionError("invalid entry structure was accepted")
+    except armour.pdb.exc.StructureError:
+        pass
+
+    assert not ex.ents
+
+    print("add_entries ok")
+
+
+def check_write_into() -> None:
+    """`write_into` appends exactly the full entry"""
+
+    e: armour.pdb.entries.PdbRawEntry = armour.pdb.entries.PdbRawEntry(
+        empty_head(), fields={b"x": b"x"}
+    ).rehash()
+
+    buf: bytearray = bytearray(b"prefix")
+    e.write_into(buf)
+    assert bytes(buf) == b"prefix" + e.full_entry
+
+    print("write_into ok")
+
+
+def check_crypt_session() -> None:
+    """the secure session round trips and is rebuilt when the key changes"""
+
+    h: armour.pdb.header.PdbHeader = empty_head()
+    session: armour.crypt.SecureSession = h.crypt_session()
+
+    assert h.crypt_session() is session
+    assert session.decrypt(session.encrypt(b"data", h.zstd_comp_lvl)) == b"data"
+
+    h.password += b"!"
+    assert h.crypt_session() is not session
+
+    print("crypt session ok")
+
+
+def check_gather_struct() -> None:
+    """a structurally invalid entry makes `gather` add nothing"""
+
+    h: armour.pdb.header.PdbHeader = empty_head()
+    ex: armour.pdb.entries.PdbEntries = armour.pdb.entries.PdbEntries(h)
+
+    for idx in range(2):
+        ex.add_entry(
+            armour.pdb.entries.PdbPwdEntry(
+                h,
+                fields={b"n": bytes([idx + 1]), b"u": b"u", b"p": b"p", b"r": b"r"},
+            ).rehash()
+        )
+
+    ex.ents.append(armour.pdb.entries.PdbRawEntry(h, fields={b"n": b"n"}).rehash())
+    ex.commit()
+
+    ex = armour.pdb.entries.PdbEntries(h)
+
+    try:
+        ex.gather(jobs=2)
+        raise AssertionError("invalid entry structure was accepted")
+    except armour.pdb.exc.StructureError:
+        pass
+
+    assert not ex.ents
+
+    print("gather structure ok")
+
+
 def main() -> int:
     """entry / main function"""
 
+    check_field_order()
+    check_subclass()
+    check_entry_cache()
+    check_write_to()
+    check_derived_key()
+    check_plain_cache()
+    check_add_entries()
+    check_write_into()
+    check_crypt_session()
+    check_gather_struct()
+
     p: armour.pdb.header.PdbHeader
 
     if os.path.isfile("pdb.pdb"):